@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+import os
+import random
+import string
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from typing import Callable
+
+SEED = 2020
+
+
+def _timed(function: Callable[[], object], repeat: int = 3) -> float:
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def _report(label: str, seconds: float | None) -> None:
+    if seconds is None:
+        print(f"  {label:<40} skipped")
+    else:
+        print(f"  {label:<40} {seconds * 1000:10.2f} ms")
+
+
+def _allocated_bytes(function: Callable[[], object]) -> int:
+    tracemalloc.start()
+    result = function()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def benchmark_day_01() -> None:
+    from aoc2020_01 import find_n_entries, find_n_entries_recursive
+
+    rng = random.Random(SEED)
+    for size in (10**4, 10**5, 10**6):
+        numbers = sorted(rng.randrange(10**9) for _ in range(size))
+        for n in (2, 3):
+            total = sum(rng.sample(numbers, n))
+            print(f"{size} entries, n={n}:")
+            _report(
+                "bisect / two pointers",
+                _timed(lambda: find_n_entries(numbers, n, total)),
+            )
+            # the recursive path is quadratic for n=3, don't wait for it
+            recursive = None
+            if n == 2 or size <= 10**4:
+                recursive = _timed(
+                    lambda: find_n_entries_recursive(numbers, n, total), repeat=1
+                )
+            _report("recursive backtracking", recursive)
+
+
+def benchmark_day_02() -> None:
+    from dataclasses import make_dataclass
+
+    from aoc2020_02 import LazyRecord, Record, parse_password_columns
+
+    # the record layout before it got slots
+    DictRecord = make_dataclass(
+        "DictRecord",
+        [("min_count", int), ("max_count", int), ("character", str), ("password", str)],
+    )
+
+    rng = random.Random(SEED)
+    size = 10**5
+    lines = []
+    for _ in range(size):
+        low = rng.randint(1, 10)
+        high = rng.randint(low, 20)
+        password = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 20)))
+        lines.append(f"{low}-{high} {rng.choice(password)}: {password}")
+    text = "\n".join(lines) + "\n"
+
+    def dict_records() -> list[object]:
+        records = []
+        for line in lines:
+            record = Record.from_password_list_line(line)
+            records.append(
+                DictRecord(
+                    record.min_count,
+                    record.max_count,
+                    record.character,
+                    record.password,
+                )
+            )
+        return records
+
+    def slotted_records() -> list[Record]:
+        return [Record.from_password_list_line(line) for line in lines]
+
+    print(f"{size} records, bytes per record:")
+    for label, build in (
+        ("dataclass with __dict__", dict_records),
+        ("slotted dataclass", slotted_records),
+        ("lazy view (unparsed)", lambda: [LazyRecord(line) for line in lines]),
+        ("columns", lambda: parse_password_columns(text)),
+    ):
+        print(f"  {label:<40} {_allocated_bytes(build) / size:10.1f}")
+
+
+def _write_passport_file(file_name: str, size: int) -> None:
+    from aoc2020_04 import INPUT
+
+    with open(INPUT, "rb") as infile:
+        block = infile.read().rstrip(b"\n") + b"\n\n"
+
+    with open(file_name, "wb") as outfile:
+        written = 0
+        while written < size:
+            outfile.write(block)
+            written += len(block)
+
+
+def benchmark_day_04(size_mb: str = "5120") -> None:
+    from aoc2020_04 import validate_file_parallel
+
+    size = int(size_mb) * 2**20
+    max_workers = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "passports.txt")
+        _write_passport_file(file_name, size)
+        print(f"{size_mb} MB of passports:")
+        workers = 1
+        while True:
+            _report(
+                f"{workers} worker(s)",
+                _timed(lambda: validate_file_parallel(file_name, workers), repeat=1),
+            )
+            if workers >= max_workers:
+                break
+            workers = min(workers * 2, max_workers)
+
+
+def _bag_rule(bag: int, contents: list[tuple[int, int]]) -> str:
+    if not contents:
+        return f"shade {bag} bags contain no other bags."
+    inside = ", ".join(f"{amount} shade {sub_bag} bags" for sub_bag, amount in contents)
+    return f"shade {bag} bags contain {inside}."
+
+
+def _bag_contents(rng: random.Random, bag: int, size: int) -> list[tuple[int, int]]:
+    # only bags with a higher number, so the rules stay acyclic
+    candidates = range(bag + 1, min(bag + 1000, size))
+    count = min(rng.choice((0, 1, 1, 2)), len(candidates))
+    return [(sub_bag, rng.randint(1, 5)) for sub_bag in rng.sample(candidates, count)]
+
+
+def benchmark_day_07(size: str = "100000") -> None:
+    from aoc2020_07 import BagIndex, build_graph
+
+    rng = random.Random(SEED)
+    bags = int(size)
+    rules = [_bag_rule(bag, _bag_contents(rng, bag, bags)) for bag in range(bags)]
+    print(f"{bags} rules:")
+    index = None
+
+    def rebuild() -> None:
+        nonlocal index
+        index = BagIndex(build_graph(rules))
+
+    _report("build graph and index", _timed(rebuild, repeat=1))
+    assert index is not None
+
+    updates = 1000
+    edits = []
+    for _ in range(updates):
+        bag = rng.randrange(bags)
+        rule = _bag_rule(bag, _bag_contents(rng, bag, bags))
+        edits.append((rule, rng.randrange(bags)))
+
+    def update_and_query() -> None:
+        for rule, queried in edits:
+            index.replace_rule(rule)
+            index.count_bags_needed(f"shade {queried}")
+            index.count_bags_that_can_contain_bag(f"shade {queried}")
+
+    _report(
+        "replace rule + both queries (mean)",
+        _timed(update_and_query, repeat=1) / updates,
+    )
+
+
+def _encoded_stream(rng: random.Random, preamble: int, size: int) -> list[int]:
+    numbers = [rng.randrange(1, 100) for _ in range(preamble)]
+    while len(numbers) < size:
+        first, second = rng.sample(numbers[-preamble:], 2)
+        numbers.append(first + second)
+    return numbers
+
+
+def benchmark_day_09() -> None:
+    from aoc2020_09 import find_error, find_error_sorted_windows
+
+    rng = random.Random(SEED)
+    size = 20000
+    for preamble in (25, 1000):
+        numbers = _encoded_stream(rng, preamble, size)
+        numbers.append(1)  # invalid, so the whole stream gets validated
+        print(f"{size} numbers, preamble={preamble}:")
+        _report(
+            "sliding window multiset", _timed(lambda: find_error(numbers, preamble))
+        )
+        _report(
+            "sorted windows",
+            _timed(lambda: find_error_sorted_windows(numbers, preamble), repeat=1),
+        )
+
+
+def benchmark_day_10() -> None:
+    from aoc2020_10 import (
+        count_distinct_adapter_chains,
+        count_distinct_adapter_chains_by_groups,
+    )
+
+    rng = random.Random(SEED)
+    for size in (10**3, 10**4, 10**5, 10**6):
+        adapters = [0]
+        for _ in range(size):
+            adapters.append(adapters[-1] + rng.choice((1, 1, 1, 2, 3)))
+        print(f"{size} adapters:")
+        _report(
+            "dynamic programming",
+            _timed(lambda: count_distinct_adapter_chains(adapters), repeat=1),
+        )
+        # enumeration is exponential in the longest run of 1-jolt gaps
+        groups = None
+        if size <= 10**3:
+            groups = _timed(
+                lambda: count_distinct_adapter_chains_by_groups(adapters), repeat=1
+            )
+        _report("droppable group enumeration", groups)
+
+
+BENCHMARKS: dict[int, Callable[..., None]] = {
+    1: benchmark_day_01,
+    2: benchmark_day_02,
+    4: benchmark_day_04,
+    7: benchmark_day_07,
+    9: benchmark_day_09,
+    10: benchmark_day_10,
+}
+
+
+def main() -> None:
+    day_number = int(sys.argv[1])
+    if day_number not in BENCHMARKS:
+        print(f"No benchmark for day {day_number}")
+        sys.exit(1)
+
+    BENCHMARKS[day_number](*sys.argv[2:])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} day_number [benchmark arguments]")
+        sys.exit(1)
+
+    main()
@@ -3,15 +3,44 @@
 https://adventofcode.com/2020/day/1"""
 
 import bisect
+import itertools
 import math
+from array import array
+from collections import Counter
+from typing import Iterable, Iterator
 
 INPUT = "aoc2020_01_input.txt"
 SUM = 2020
+CHUNK_SIZE = 1 << 20
 
 
-def load_entries(report_file: str) -> list[int]:
-    with open(report_file, "rt", encoding="utf-8") as infile:
-        return list(map(int, infile.readlines()))
+def _integer_chunks(input_file: str, chunk_size: int) -> Iterator[list[bytes]]:
+    remainder = b""
+    with open(input_file, "rb") as infile:
+        while chunk := infile.read(chunk_size):
+            tokens = (remainder + chunk).split()
+            # last token may continue in the next chunk
+            remainder = b"" if chunk[-1:].isspace() or not tokens else tokens.pop()
+            yield tokens
+
+    if remainder:
+        yield [remainder]
+
+
+def iter_integers(input_file: str, chunk_size: int = CHUNK_SIZE) -> Iterator[int]:
+    for tokens in _integer_chunks(input_file, chunk_size):
+        yield from map(int, tokens)
+
+
+def load_integers(input_file: str, chunk_size: int = CHUNK_SIZE) -> array:
+    numbers = array("q")
+    for tokens in _integer_chunks(input_file, chunk_size):
+        numbers.extend(map(int, tokens))
+    return numbers
+
+
+def load_entries(report_file: str) -> array:
+    return load_integers(report_file)
 
 
 def number_in_list(numbers: list[int], number: int, start: int = 0) -> bool:
@@ -19,10 +48,145 @@ def number_in_list(numbers: list[int], number: int, start: int = 0) -> bool:
     return idx != len(numbers) and numbers[idx] == number
 
 
+def _capped_entries(numbers: Iterable[int], k: int) -> list[int]:
+    # a value can't be used more than k times in one solution
+    return sorted(
+        itertools.chain.from_iterable(
+            itertools.repeat(number, min(count, k))
+            for number, count in Counter(numbers).items()
+        )
+    )
+
+
+def _two_sum(
+    numbers: Iterable[int], total: int, first_only: bool
+) -> list[tuple[int, ...]]:
+    if first_only:
+        seen: set[int] = set()
+        for number in numbers:
+            if total - number in seen:
+                return [tuple(sorted((total - number, number)))]
+            seen.add(number)
+        return []
+
+    counts = Counter(numbers)
+    solutions: list[tuple[int, ...]] = []
+    for number in sorted(counts):
+        remaining = total - number
+        if remaining < number:
+            break
+        if remaining > number and remaining in counts:
+            solutions.append((number, remaining))
+        elif remaining == number and counts[number] > 1:
+            solutions.append((number, number))
+
+    return solutions
+
+
+def _two_sum_sorted(numbers: list[int], total: int) -> list[tuple[int, ...]]:
+    # first pair in order, without hashing the whole input
+    for idx, number in enumerate(numbers):
+        remaining = total - number
+        if remaining < number:
+            break
+        if number_in_list(numbers, remaining, idx + 1):
+            return [(number, remaining)]
+    return []
+
+
+def _three_sum(
+    numbers: list[int], total: int, first_only: bool
+) -> list[tuple[int, ...]]:
+    solutions: list[tuple[int, ...]] = []
+    for idx, number in enumerate(numbers[:-2]):
+        if idx and numbers[idx - 1] == number:
+            continue
+
+        low, high = idx + 1, len(numbers) - 1
+        while low < high:
+            current = number + numbers[low] + numbers[high]
+            if current < total:
+                low += 1
+            elif current > total:
+                high -= 1
+            else:
+                solutions.append((number, numbers[low], numbers[high]))
+                if first_only:
+                    return solutions
+                low += 1
+                while low < high and numbers[low] == numbers[low - 1]:
+                    low += 1
+                high -= 1
+
+    return solutions
+
+
+def _meet_in_the_middle(
+    numbers: list[int], k: int, total: int, first_only: bool
+) -> list[tuple[int, ...]]:
+    left_size = k // 2
+    right_size = k - left_size
+
+    # index tuples of the left halves, keyed by their sum
+    left_halves: dict[int, list[tuple[int, ...]]] = {}
+    for indices in itertools.combinations(range(len(numbers)), left_size):
+        left_sum = sum(numbers[idx] for idx in indices)
+        left_halves.setdefault(left_sum, []).append(indices)
+
+    solutions: set[tuple[int, ...]] = set()
+    for indices in itertools.combinations(range(len(numbers)), right_size):
+        right_sum = sum(numbers[idx] for idx in indices)
+        for left_indices in left_halves.get(total - right_sum, []):
+            # every solution is found exactly once: left half precedes right half
+            if left_indices[-1] >= indices[0]:
+                continue
+            solutions.add(tuple(numbers[idx] for idx in left_indices + indices))
+            if first_only:
+                return list(solutions)
+
+    return sorted(solutions)
+
+
+def find_k_sum(
+    numbers: Iterable[int],
+    k: int,
+    total: int,
+    first_only: bool = False,
+    presorted: bool = False,
+) -> list[tuple[int, ...]]:
+    if k < 1:
+        raise ValueError("k should be 1 or higher")
+
+    if k == 1:
+        return [(total,)] if total in set(numbers) else []
+    if presorted and first_only:
+        # capping duplicates only saves work when every solution is needed
+        entries = numbers if isinstance(numbers, list) else list(numbers)
+        if k == 2:
+            return _two_sum_sorted(entries, total)
+    elif k == 2:
+        return _two_sum(numbers, total, first_only)
+    else:
+        entries = _capped_entries(numbers, k)
+
+    if k == 3:
+        return _three_sum(entries, total, first_only)
+    return _meet_in_the_middle(entries, k, total, first_only)
+
+
 def find_n_entries(numbers: list[int], n: int, total: int) -> list[int]:
     if n < 1:
         raise ValueError("n should be 1 or higher")
 
+    # numbers are sorted, as for the recursive search
+    solutions = find_k_sum(numbers, n, total, first_only=True, presorted=True)
+    return list(solutions[0]) if solutions else []
+
+
+def find_n_entries_recursive(numbers: list[int], n: int, total: int) -> list[int]:
+    if n < 1:
+        raise ValueError("n should be 1 or higher")
+
     selected: list[int] = []
 
     def find(start: int = 0) -> bool:
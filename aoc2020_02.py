@@ -2,17 +2,21 @@
 """--- Day 2: Password Philosophy ---
 https://adventofcode.com/2020/day/2"""
 
+import os
 import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from typing import Type, TypeVar
 
 INPUT = "aoc2020_02_input.txt"
 T = TypeVar("T", bound="Record")
+CHUNK_SIZE = 1 << 20  # bytes parsed at once by the bulk path
 
 _pattern = re.compile(r"(\d+)-(\d+) (.): (.+)")
 
 
-@dataclass
+@dataclass(slots=True)
 class Record:
     min_count: int
     max_count: int
@@ -42,7 +46,32 @@ class Record:
         return count == 1
 
 
-def check_password_file(filename: str) -> None:
+class LazyRecord:
+    __slots__ = ("line", "_record")
+
+    def __init__(self, line: str) -> None:
+        self.line = line
+        self._record: Record | None = None
+
+    @property
+    def record(self) -> Record:
+        if self._record is None:
+            self._record = Record.from_password_list_line(self.line)
+        return self._record
+
+    def is_valid_policy_1(self) -> bool:
+        return self.record.is_valid_policy_1()
+
+    def is_valid_policy_2(self) -> bool:
+        return self.record.is_valid_policy_2()
+
+
+def load_lazy_records(filename: str) -> list[LazyRecord]:
+    with open(filename, "rt", encoding="utf-8") as infile:
+        return [LazyRecord(line.rstrip("\n")) for line in infile]
+
+
+def check_password_file(filename: str) -> tuple[int, int]:
     valid_count_1 = 0
     valid_count_2 = 0
     with open(filename, "rt", encoding="utf-8") as infile:
@@ -53,11 +82,116 @@ def check_password_file(filename: str) -> None:
             if record.is_valid_policy_2():
                 valid_count_2 += 1
 
-    print(f"Valid passwords: {valid_count_1} / {valid_count_2}")  # 469 / 267
+    return valid_count_1, valid_count_2
+
+
+def parse_password_columns(
+    text: str,
+) -> tuple[array, array, list[str], list[str]]:
+    min_counts = array("l")
+    max_counts = array("l")
+    characters: list[str] = []
+    passwords: list[str] = []
+    for match in _pattern.finditer(text):
+        min_count, max_count, character, password = match.groups()
+        min_counts.append(int(min_count))
+        max_counts.append(int(max_count))
+        characters.append(character)
+        passwords.append(password)
+
+    lines = text.count("\n") + (bool(text) and not text.endswith("\n"))
+    if len(passwords) != lines:
+        raise ValueError(f"Cannot parse {lines - len(passwords)} line(s)")
+
+    return min_counts, max_counts, characters, passwords
+
+
+def count_valid_policy_1(
+    min_counts: array, max_counts: array, characters: list[str], passwords: list[str]
+) -> int:
+    return sum(
+        min_count <= password.count(character) <= max_count
+        for min_count, max_count, character, password in zip(
+            min_counts, max_counts, characters, passwords
+        )
+    )
+
+
+def count_valid_policy_2(
+    min_counts: array, max_counts: array, characters: list[str], passwords: list[str]
+) -> int:
+    # out of range positions slice to "" and never match the character
+    return sum(
+        (min_count > 0 and password[min_count - 1 : min_count] == character)
+        != (max_count > 0 and password[max_count - 1 : max_count] == character)
+        for min_count, max_count, character, password in zip(
+            min_counts, max_counts, characters, passwords
+        )
+    )
+
+
+def count_valid_passwords(text: str) -> tuple[int, int]:
+    columns = parse_password_columns(text)
+    return count_valid_policy_1(*columns), count_valid_policy_2(*columns)
+
+
+def _byte_ranges(filename: str, parts: int) -> list[tuple[int, int]]:
+    size = os.path.getsize(filename)
+    boundaries = [0]
+    with open(filename, "rb") as infile:
+        for part in range(1, parts):
+            infile.seek(max(size * part // parts, boundaries[-1]))
+            infile.readline()
+            boundaries.append(min(infile.tell(), size))
+    boundaries.append(size)
+
+    return [
+        (start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end
+    ]
+
+
+def _count_valid_passwords_in_range(
+    filename: str, start: int, end: int
+) -> tuple[int, int]:
+    with open(filename, "rb") as infile:
+        infile.seek(start)
+        data = infile.read(end - start)
+    text = data.decode("utf-8")
+    if "\r" in text:
+        # same universal newlines handling as the text mode per-record path
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return count_valid_passwords(text)
+
+
+def check_password_file_bulk(
+    filename: str, workers: int = 1, chunk_size: int = CHUNK_SIZE
+) -> tuple[int, int]:
+    # ranges of about chunk_size bytes, so memory doesn't grow with the file
+    parts = max(workers, -(-os.path.getsize(filename) // chunk_size))
+    ranges = _byte_ranges(filename, parts)
+    valid_count_1 = 0
+    valid_count_2 = 0
+    if workers <= 1:
+        for start, end in ranges:
+            count_1, count_2 = _count_valid_passwords_in_range(filename, start, end)
+            valid_count_1 += count_1
+            valid_count_2 += count_2
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for count_1, count_2 in executor.map(
+                _count_valid_passwords_in_range,
+                [filename] * len(ranges),
+                *zip(*ranges),
+            ):
+                valid_count_1 += count_1
+                valid_count_2 += count_2
+
+    return valid_count_1, valid_count_2
 
 
 def main() -> None:
-    check_password_file(INPUT)
+    valid_count_1, valid_count_2 = check_password_file_bulk(INPUT)
+    print(f"Valid passwords: {valid_count_1} / {valid_count_2}")  # 469 / 267
 
 
 if __name__ == "__main__":
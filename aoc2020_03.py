@@ -3,10 +3,15 @@
 https://adventofcode.com/2020/day/3"""
 
 import math
-from typing import Iterable
+import mmap
+import os
+from array import array
+from typing import Iterable, Sequence
 
 INPUT = "aoc2020_03_input.txt"
 TREE = "#"
+OPEN = "."
+OFFSETS_SUFFIX = ".offsets"
 SLOPE = (3, 1)
 SLOPES = [(1, 1), (3, 1), (5, 1), (7, 1), (1, 2)]
 
@@ -36,16 +41,122 @@ def count_trees_in_way(terrain_map_lines: Iterable[str], slope: tuple[int, int])
     return count
 
 
+_to_bits = str.maketrans({TREE: "1", OPEN: "0"})
+
+
+def load_terrain(terrain_map_lines: Iterable[str]) -> tuple[list[int], int]:
+    # bit x of a row is set when there is a tree in column x
+    rows: list[int] = []
+    width = 0
+    for line in terrain_map_lines:
+        line = line.strip()
+        if not line:
+            continue
+        if rows and len(line) != width:
+            raise ValueError(f"Row {len(rows)} is not {width} columns wide")
+        width = len(line)
+        rows.append(int(line[::-1].translate(_to_bits), 2))
+
+    return rows, width
+
+
+def count_trees_for_slopes(
+    rows: Sequence[int], width: int, slopes: Sequence[tuple[int, int]]
+) -> list[int]:
+    for slope in slopes:
+        dx, dy = slope
+        if dy <= 0 or dx <= 0:
+            raise ValueError(f"Slope components must be higher than 0 ({slope})")
+
+    counts = [0] * len(slopes)
+    slopes_by_dy: dict[int, list[tuple[int, int]]] = {}
+    for idx, (dx, dy) in enumerate(slopes):
+        slopes_by_dy.setdefault(dy, []).append((idx, dx))
+
+    for row_idx in range(1, len(rows)):
+        row = rows[row_idx]
+        for dy, indexed_dxs in slopes_by_dy.items():
+            if row_idx % dy:
+                continue
+            step = row_idx // dy
+            for idx, dx in indexed_dxs:
+                counts[idx] += row >> (step * dx % width) & 1
+
+    return counts
+
+
+def build_line_offsets(terrain_map_file: str) -> array:
+    # start of every line followed by the file size as a sentinel
+    offsets = array("q", [0])
+    size = os.path.getsize(terrain_map_file)
+    if not size:
+        return offsets
+
+    with open(terrain_map_file, "rb") as infile, mmap.mmap(
+        infile.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped:
+        position = mapped.find(b"\n")
+        while position != -1 and position + 1 < size:
+            offsets.append(position + 1)
+            position = mapped.find(b"\n", position + 1)
+    offsets.append(size)
+
+    return offsets
+
+
+def load_line_offsets(terrain_map_file: str) -> array:
+    offsets_file = terrain_map_file + OFFSETS_SUFFIX
+    is_cached = os.path.exists(offsets_file) and (
+        os.path.getmtime(offsets_file) >= os.path.getmtime(terrain_map_file)
+    )
+    if is_cached:
+        offsets = array("q")
+        try:
+            with open(offsets_file, "rb") as infile:
+                offsets.frombytes(infile.read())
+        except (OSError, ValueError):
+            offsets = array("q")  # unreadable or truncated, rebuild it
+        if offsets and offsets[-1] == os.path.getsize(terrain_map_file):
+            return offsets
+
+    offsets = build_line_offsets(terrain_map_file)
+    try:
+        with open(offsets_file, "wb") as outfile:
+            offsets.tofile(outfile)
+    except OSError:
+        pass  # the cache is optional, e.g. in a read-only directory
+
+    return offsets
+
+
+def count_trees_in_way_mapped(terrain_map_file: str, slope: tuple[int, int]) -> int:
+    dx, dy = slope
+    if dy <= 0 or dx <= 0:
+        raise ValueError(f"Slope components must be higher than 0 ({slope})")
+
+    offsets = load_line_offsets(terrain_map_file)
+    if len(offsets) < 2:
+        return 0
+
+    count = 0
+    tree = ord(TREE)
+    with open(terrain_map_file, "rb") as infile, mmap.mmap(
+        infile.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped:
+        for step, row_idx in enumerate(range(dy, len(offsets) - 1, dy), start=1):
+            line = mapped[offsets[row_idx] : offsets[row_idx + 1]].strip()
+            if line[step * dx % len(line)] == tree:
+                count += 1
+
+    return count
+
+
 def main() -> None:
-    trees = []
     with open(INPUT, "rt", encoding="utf-8") as infile:
-        terrain_map_lines = infile.readlines()
+        rows, width = load_terrain(infile)
 
-    for slope in SLOPES:
-        count = count_trees_in_way(terrain_map_lines, slope)
-        trees.append(count)
-        if slope == SLOPE:
-            print(f"Encountered trees: {count}")  # 220
+    trees = count_trees_for_slopes(rows, width, SLOPES)
+    print(f"Encountered trees: {trees[SLOPES.index(SLOPE)]}")  # 220
 
     product = math.prod(trees)
     print(f"Product of trees for slopes: {product} ({trees})")  # 2138320800
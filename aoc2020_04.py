@@ -2,7 +2,13 @@
 """--- Day 4: Passport Processing ---
 https://adventofcode.com/2020/day/4"""
 
+import mmap
+import os
 import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
 
 INPUT = "aoc2020_04_input.txt"
 PASSPORT_FIELDS = {
@@ -16,6 +22,16 @@ PASSPORT_FIELDS = {
     "cid": "Country ID",
 }
 OPTIONAL_FIELD = "cid"
+PASSPORT_RULES: dict[str, dict] = {
+    "byr": {"range": (1920, 2002)},
+    "iyr": {"range": (2010, 2020)},
+    "eyr": {"range": (2020, 2030)},
+    "hgt": {"units": {"cm": (150, 193), "in": (59, 76)}},
+    "hcl": {"regex": r"#[0-9a-f]{6}"},
+    "ecl": {"enum": ("amb", "blu", "brn", "gry", "grn", "hzl", "oth")},
+    "pid": {"digits": 9},
+}
+T_VALIDATOR = Callable[[str], bool]
 
 
 def is_valid_passport(document: dict[str, str]) -> bool:
@@ -32,86 +48,211 @@ def _number_valid(number_string: str, low: int, high: int) -> bool:
     return low <= number <= high
 
 
+def _compile_rule(rule: dict) -> T_VALIDATOR:
+    kind, argument = next(iter(rule.items()))
+    if kind == "range":
+        low, high = argument
+        return lambda value: _number_valid(value, low, high)
+    if kind == "units":
+        units = dict(argument)
+        return lambda value: value[-2:] in units and _number_valid(
+            value[:-2], *units[value[-2:]]
+        )
+    if kind == "regex":
+        pattern = re.compile(argument)
+        return lambda value: pattern.fullmatch(value) is not None
+    if kind == "enum":
+        allowed = frozenset(argument)
+        return lambda value: value in allowed
+    if kind == "digits":
+        return lambda value: len(value) == argument and value.isnumeric()
+    raise ValueError(f"Incorrect rule: {rule!r}")
+
+
+def compile_validators(
+    rules: dict[str, dict] = PASSPORT_RULES,
+) -> dict[str, T_VALIDATOR | None]:
+    # required fields in PASSPORT_FIELDS order, None when only presence is checked
+    return {
+        field: _compile_rule(rules[field]) if field in rules else None
+        for field in PASSPORT_FIELDS
+        if field != OPTIONAL_FIELD
+    }
+
+
+_validators = compile_validators()
+
+
+def _field_valid(field: str, value: str) -> bool:
+    validator = _validators[field]
+    return validator is None or validator(value)
+
+
 def byr_valid(byr: str) -> bool:
-    return _number_valid(byr, 1920, 2002)
+    return _field_valid("byr", byr)
 
 
 def iyr_valid(iyr: str) -> bool:
-    return _number_valid(iyr, 2010, 2020)
+    return _field_valid("iyr", iyr)
 
 
 def eyr_valid(eyr: str) -> bool:
-    return _number_valid(eyr, 2020, 2030)
+    return _field_valid("eyr", eyr)
 
 
 def hgt_valid(hgt: str) -> bool:
-    value = hgt[:-2]
-    unit = hgt[-2:]
-    if unit == "cm":
-        return _number_valid(value, 150, 193)
-    if unit == "in":
-        return _number_valid(value, 59, 76)
-    return False
+    return _field_valid("hgt", hgt)
 
 
 def hcl_valid(hcl: str) -> bool:
-    return re.fullmatch(r"#[0-9a-f]{6}", hcl) is not None
+    return _field_valid("hcl", hcl)
 
 
 def ecl_valid(ecl: str) -> bool:
-    return re.fullmatch(r"amb|blu|brn|gry|grn|hzl|oth", ecl) is not None
+    return _field_valid("ecl", ecl)
 
 
 def pid_valid(pid: str) -> bool:
-    return len(pid) == 9 and pid.isnumeric()
+    return _field_valid("pid", pid)
 
 
 def is_valid_passport_strict(document: dict[str, str]) -> bool:
-    return (
-        is_valid_passport(document)
-        and byr_valid(document["byr"])
-        and iyr_valid(document["iyr"])
-        and eyr_valid(document["eyr"])
-        and hgt_valid(document["hgt"])
-        and hcl_valid(document["hcl"])
-        and ecl_valid(document["ecl"])
-        and pid_valid(document["pid"])
+    return is_valid_passport(document) and all(
+        _field_valid(field, document[field]) for field in _validators
     )
 
 
-def parse_input(file_name: str) -> list[dict[str, str]]:
-    documents = []
+class PassportValidator:
+    def __init__(
+        self, rules: dict[str, dict] = PASSPORT_RULES, timed: bool = False
+    ) -> None:
+        self.validators = compile_validators(rules)
+        self.timed = timed
+        self.checked = 0
+        self.valid = 0
+        self.failures: Counter[str] = Counter()
+        self.timings: dict[str, float] = dict.fromkeys(self.validators, 0.0)
+
+    def validate(self, document: dict[str, str]) -> bool:
+        self.checked += 1
+        for field, validator in self.validators.items():
+            value = document.get(field)
+            if value is None:
+                self.failures[field] += 1
+                return False
+            if validator is None:
+                continue
+
+            if self.timed:
+                start = time.perf_counter()
+                valid = validator(value)
+                self.timings[field] += time.perf_counter() - start
+            else:
+                valid = validator(value)
+
+            if not valid:
+                self.failures[field] += 1
+                return False
+
+        self.valid += 1
+        return True
+
+
+def _documents_from_lines(lines: Iterable[str]) -> Iterator[dict[str, str]]:
     document: dict[str, str] = {}
 
+    for line in lines:
+        line = line.strip()
+        if not line and document:
+            yield document
+            document = {}
+            continue
+
+        document.update(
+            {key: value for key, value in (item.split(":") for item in line.split())}
+        )
+
+    if document:
+        yield document
+
+
+def iter_documents(file_name: str) -> Iterator[dict[str, str]]:
     with open(file_name, "rt", encoding="utf-8") as infile:
+        yield from _documents_from_lines(infile)
+
+
+def parse_input(file_name: str) -> list[dict[str, str]]:
+    return list(iter_documents(file_name))
+
+
+def _shard_boundaries(file_name: str, shards: int) -> list[tuple[int, int]]:
+    size = os.path.getsize(file_name)
+    if not size:
+        return []
+
+    boundaries = [0]
+    with open(file_name, "rb") as infile, mmap.mmap(
+        infile.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped:
+        for shard in range(1, shards):
+            # documents are separated by a blank line, split right after it
+            position = mapped.find(b"\n\n", max(size * shard // shards, boundaries[-1]))
+            if position == -1:
+                break
+            boundaries.append(position + 2)
+    boundaries.append(size)
+
+    return [
+        (start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end
+    ]
+
+
+def _shard_lines(file_name: str, start: int, end: int) -> Iterator[str]:
+    with open(file_name, "rb") as infile:
+        infile.seek(start)
+        position = start
         for line in infile:
-            line = line.strip()
-            if not line and document:
-                documents.append(document)
-                document = {}
-                continue
+            if position >= end:
+                break
+            position += len(line)
+            yield line.decode("utf-8")
 
-            document.update(
-                {
-                    key: value
-                    for key, value in (item.split(":") for item in line.split())
-                }
-            )
 
-        if document:
-            documents.append(document)
+def _validate_shard(file_name: str, start: int, end: int) -> tuple[int, int]:
+    valid_count = 0
+    valid_count_strict = 0
+    for document in _documents_from_lines(_shard_lines(file_name, start, end)):
+        if is_valid_passport(document):
+            valid_count += 1
+        if is_valid_passport_strict(document):
+            valid_count_strict += 1
+
+    return valid_count, valid_count_strict
 
-    return documents
+
+def validate_file_parallel(file_name: str, workers: int = 1) -> tuple[int, int]:
+    shards = _shard_boundaries(file_name, workers)
+    if workers <= 1:
+        counts = [_validate_shard(file_name, start, end) for start, end in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counts = list(
+                executor.map(_validate_shard, [file_name] * len(shards), *zip(*shards))
+            )
+
+    valid_count = sum(count for count, _ in counts)
+    valid_count_strict = sum(count for _, count in counts)
+    return valid_count, valid_count_strict
 
 
 def main() -> None:
     valid_count_1 = 0
-    valid_count_2 = 0
-    for document in parse_input(INPUT):
+    validator = PassportValidator()
+    for document in iter_documents(INPUT):
         if is_valid_passport(document):
             valid_count_1 += 1
-        if is_valid_passport_strict(document):
-            valid_count_2 += 1
+        validator.validate(document)
+    valid_count_2 = validator.valid
 
     print(f"Valid documents: {valid_count_1} / {valid_count_2}")  # 235 / 194
 
@@ -2,22 +2,23 @@
 """--- Day 5: Binary Boarding ---
 https://adventofcode.com/2020/day/5"""
 
+import re
+
 INPUT = "aoc2020_05_input.txt"
+ROW_BITS = 7
+COLUMN_BITS = 3
+_to_bits = bytes.maketrans(b"FBLR", b"0101")
+_passes_pattern = re.compile(
+    rb"(?:\s*[FB]{%d}[LR]{%d}(?!\S))*\s*" % (ROW_BITS, COLUMN_BITS)
+)
 
 
 def _find_position(navigation: str, left: str, right: str) -> int:
-    start = 0
-    end = 2 ** len(navigation) - 1
-
-    for direction in navigation:
-        if direction == left:
-            end = (start + end + 1) // 2 - 1
-        elif direction == right:
-            start = (start + end + 1) // 2
-        else:
-            raise ValueError(f"Incorrect direction: {direction!r}")
+    incorrect = navigation.strip(left + right)
+    if incorrect:
+        raise ValueError(f"Incorrect direction: {incorrect[0]!r}")
 
-    return start
+    return int(navigation.replace(left, "0").replace(right, "1") or "0", 2)
 
 
 def find_row(navigation: str) -> int:
@@ -28,25 +29,118 @@ def find_column(navigation: str) -> int:
     return _find_position(navigation, left="L", right="R")
 
 
-def get_seat_id(row: int, column: int) -> int:
-    return row * 8 + column
+def get_seat_id(row: int, column: int, column_bits: int = COLUMN_BITS) -> int:
+    return row << column_bits | column
+
+
+def seat_id_from_navigation(
+    navigation: str, row_bits: int = ROW_BITS, column_bits: int = COLUMN_BITS
+) -> int:
+    if len(navigation) != row_bits + column_bits:
+        raise ValueError(f"Incorrect boarding pass length: {navigation!r}")
+
+    return get_seat_id(
+        find_row(navigation[:row_bits]),
+        find_column(navigation[row_bits:]),
+        column_bits,
+    )
+
 
+def decode_seat_ids(boarding_passes: bytes) -> list[int]:
+    if not _passes_pattern.fullmatch(boarding_passes):
+        # the per-pass decoder raises the error for the first bad pass
+        for navigation in boarding_passes.split():
+            seat_id_from_navigation(navigation.decode("utf-8", "replace"))
 
-def seat_id_from_navigation(navigation: str) -> int:
-    return get_seat_id(find_row(navigation[:7]), find_column(navigation[7:]))
+    # F/L are lower halves (0), B/R upper halves (1), so a pass is the seat ID
+    return [int(bits, 2) for bits in boarding_passes.translate(_to_bits).split()]
 
 
 def find_seat_id(seat_ids: list[int]) -> int:
-    sorted_ids = sorted(seat_ids)
-    for idx, seat_id in enumerate(sorted_ids[:-1]):
-        if sorted_ids[idx + 1] - seat_id == 2:
-            return seat_id + 1
-    return -1
+    if not seat_ids:
+        return -1
+
+    taken = bytearray(max(seat_ids) + 1)
+    for seat_id in seat_ids:
+        taken[seat_id] = 1
+
+    gap = taken.find(b"\x01\x00\x01")
+    return gap + 1 if gap != -1 else -1
+
+
+class SeatMap:
+    def __init__(
+        self, row_bits: int = ROW_BITS, column_bits: int = COLUMN_BITS
+    ) -> None:
+        self.row_bits = row_bits
+        self.column_bits = column_bits
+        self.size = 1 << (row_bits + column_bits)
+        self.occupancy = bytearray(self.size)
+        self._gaps: set[int] = set()
+
+    def seat_id(self, row: int, column: int) -> int:
+        return get_seat_id(row, column, self.column_bits)
+
+    def _check_seat_id(self, seat_id: int) -> None:
+        if not 0 <= seat_id < self.size:
+            raise ValueError(f"Seat ID out of range: {seat_id}")
+
+    def _check_seat_range(self, start: int, end: int) -> None:
+        if not 0 <= start <= end <= self.size:
+            raise ValueError(f"Seat ID range out of range: {start} to {end}")
+
+    def board(self, seat_id: int) -> None:
+        self._check_seat_id(seat_id)
+        if self.occupancy[seat_id]:
+            return
+
+        self.occupancy[seat_id] = 1
+        self._gaps.discard(seat_id)
+        # the seat can close a gap on either side of it
+        for gap in (seat_id - 2, seat_id + 2):
+            if 0 <= gap < self.size and self.occupancy[gap]:
+                between = (seat_id + gap) // 2
+                if not self.occupancy[between]:
+                    self._gaps.add(between)
+
+    def board_pass(self, navigation: str) -> int:
+        seat_id = seat_id_from_navigation(navigation, self.row_bits, self.column_bits)
+        self.board(seat_id)
+        return seat_id
+
+    def is_free(self, seat_id: int) -> bool:
+        self._check_seat_id(seat_id)
+        return not self.occupancy[seat_id]
+
+    def gaps(self) -> list[int]:
+        # free seats with both neighbouring seats taken
+        return sorted(self._gaps)
+
+    def occupied_count(self, start: int = 0, end: int | None = None) -> int:
+        end = self.size if end is None else end
+        self._check_seat_range(start, end)
+        return self.occupancy.count(1, start, end)
+
+    def free_seats(self, start: int = 0, end: int | None = None) -> list[int]:
+        end = self.size if end is None else end
+        self._check_seat_range(start, end)
+        seats = []
+        seat_id = self.occupancy.find(0, start, end)
+        while seat_id != -1:
+            seats.append(seat_id)
+            seat_id = self.occupancy.find(0, seat_id + 1, end)
+        return seats
+
+    def free_seats_in_row(self, row: int) -> list[int]:
+        if not 0 <= row < 1 << self.row_bits:
+            raise ValueError(f"Row out of range: {row}")
+        start = self.seat_id(row, 0)
+        return self.free_seats(start, start + (1 << self.column_bits))
 
 
 def main() -> None:
-    with open(INPUT, "rt", encoding="utf-8") as infile:
-        seat_ids = [seat_id_from_navigation(line.strip()) for line in infile]
+    with open(INPUT, "rb") as infile:
+        seat_ids = decode_seat_ids(infile.read())
 
     print(f"Highest seat ID: {max(seat_ids)}")  # 922
     print(f"My seat ID: {find_seat_id(seat_ids)}")  # 747
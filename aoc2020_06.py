@@ -2,15 +2,60 @@
 """--- Day 6: Custom Customs ---
 https://adventofcode.com/2020/day/6"""
 
+from typing import Iterator
+
 INPUT = "aoc2020_06_input.txt"
+QUESTIONS = "abcdefghijklmnopqrstuvwxyz"
+ALL_QUESTIONS = (1 << len(QUESTIONS)) - 1
+_question_bits = {question: 1 << idx for idx, question in enumerate(QUESTIONS)}
+
+
+def answers_mask(answers: str) -> int:
+    mask = 0
+    for answer in answers:
+        if answer not in _question_bits:
+            raise ValueError(f"Incorrect answer: {answer!r}")
+        mask |= _question_bits[answer]
+    return mask
 
 
 def count_yes_answered_in_group_by_anyone(group_answers: list[str]) -> int:
-    return len(set("".join(group_answers)))
+    mask = 0
+    for answers in group_answers:
+        mask |= answers_mask(answers)
+    return mask.bit_count()
 
 
 def count_yes_answered_in_group_by_everyone(group_answers: list[str]) -> int:
-    return len(set.intersection(*(set(answers) for answers in group_answers)))
+    mask = ALL_QUESTIONS
+    for answers in group_answers:
+        mask &= answers_mask(answers)
+    return mask.bit_count()
+
+
+def iter_group_masks(input_file: str) -> Iterator[tuple[int, int]]:
+    # (answered by anyone, answered by everyone) for each group
+    anyone = 0
+    everyone = ALL_QUESTIONS
+    group_started = False
+
+    with open(input_file, "rt", encoding="utf-8") as infile:
+        for line in infile:
+            line = line.strip()
+            if not line and group_started:
+                yield anyone, everyone
+                anyone = 0
+                everyone = ALL_QUESTIONS
+                group_started = False
+                continue
+
+            mask = answers_mask(line)
+            anyone |= mask
+            everyone &= mask
+            group_started = True
+
+        if group_started:
+            yield anyone, everyone
 
 
 def load_groups_from_input(input_file: str) -> list[list[str]]:
@@ -35,9 +80,9 @@ def load_groups_from_input(input_file: str) -> list[list[str]]:
 def main() -> None:
     sum_of_counts_1 = 0
     sum_of_counts_2 = 0
-    for group in load_groups_from_input(INPUT):
-        sum_of_counts_1 += count_yes_answered_in_group_by_anyone(group)
-        sum_of_counts_2 += count_yes_answered_in_group_by_everyone(group)
+    for anyone, everyone in iter_group_masks(INPUT):
+        sum_of_counts_1 += anyone.bit_count()
+        sum_of_counts_2 += everyone.bit_count()
 
     print(f"Sum of counts of 'yes' answers (anyone): {sum_of_counts_1}")  # 6768
     print(f"Sum of counts of 'yes' answers (everyone): {sum_of_counts_2}")  # 3489
@@ -3,9 +3,14 @@
 https://adventofcode.com/2020/day/7"""
 
 import re
+import struct
+import sys
+from array import array
 from dataclasses import dataclass, field
+from typing import Iterable, Type, TypeVar
 
 INPUT = "aoc2020_07_input.txt"
+T = TypeVar("T", bound="CompactBagGraph")
 _rule_pattern = re.compile(
     r"""
         ^ (?P<bag>.+?)\ bag                       # first bag
@@ -27,51 +32,380 @@ class Bag:
     def add_child(self, bag: "Bag", amount: int) -> None:
         self.children.append((bag, amount))
 
+    def remove_children(self) -> None:
+        for child, _ in self.children:
+            child.parents = [parent for parent in child.parents if parent is not self]
+        self.children = []
+
+
+def parse_rule(rule: str) -> tuple[str, list[tuple[str, int]]]:
+    matches = _rule_pattern.finditer(rule)
+    bag_name = next(matches).group("bag")
+    contents = [
+        (match.group("sub_bag"), int(match.group("amount"))) for match in matches
+    ]
+    return bag_name, contents
+
+
+def add_rule(graph: dict[str, Bag], rule: str) -> Bag:
+    bag_name, contents = parse_rule(rule)
+    bag = graph.setdefault(bag_name, Bag(bag_name))
+
+    for sub_bag_name, amount in contents:
+        sub_bag = graph.setdefault(sub_bag_name, Bag(sub_bag_name))
+        bag.add_child(sub_bag, amount)
+        sub_bag.add_parent(bag)
+
+    return bag
+
+
+def remove_rule(graph: dict[str, Bag], bag_name: str) -> None:
+    graph[bag_name].remove_children()
+
 
 def build_graph(rules: list[str]) -> dict[str, Bag]:
     graph: dict[str, Bag] = {}
     for rule in rules:
-        matches = _rule_pattern.finditer(rule)
-        bag_name = next(matches).group("bag")
-        bag = graph.setdefault(bag_name, Bag(bag_name))
-
-        for match in matches:
-            amount = int(match.group("amount"))
-            sub_bag_name = match.group("sub_bag")
-            sub_bag = graph.setdefault(sub_bag_name, Bag(sub_bag_name))
-            bag.add_child(sub_bag, amount)
-            sub_bag.add_parent(bag)
+        add_rule(graph, rule)
 
     return graph
 
 
-def count_bags_that_can_contain_bag(graph: dict[str, Bag], bag_name: str) -> int:
-    def traverse(bag: Bag) -> set[str]:
-        bags = {bag.name}
-        for parent in bag.parents:
-            bags.update(traverse(parent))
-        return bags
+def topological_order(graph: dict[str, Bag]) -> list[str]:
+    # contained bags come before the bags containing them
+    pending = {name: len(bag.children) for name, bag in graph.items()}
+    order = [name for name, count in pending.items() if not count]
+    for name in order:
+        for parent in graph[name].parents:
+            pending[parent.name] -= 1
+            if not pending[parent.name]:
+                order.append(parent.name)
+
+    if len(order) != len(graph):
+        raise ValueError("Bag rules contain a cycle")
+
+    return order
+
+
+class BagIndex:
+    def __init__(self, graph: dict[str, Bag]) -> None:
+        self.graph = graph
+        # bit of each bag in the ancestor sets
+        self.bit_positions = {name: idx for idx, name in enumerate(graph)}
+        self.bags_inside: dict[str, int] = {}
+        self.ancestors: dict[str, int] = {}
+
+        order = topological_order(graph)
+        for name in order:
+            self.bags_inside[name] = sum(
+                amount * (1 + self.bags_inside[child.name])
+                for child, amount in graph[name].children
+            )
+
+    def _bags_inside(self, bag_name: str) -> int:
+        stack = [bag_name]
+        while stack:
+            name = stack[-1]
+            if name in self.bags_inside:
+                stack.pop()
+                continue
+
+            children = self.graph[name].children
+            missing = [
+                child.name
+                for child, _ in children
+                if child.name not in self.bags_inside
+            ]
+            if missing:
+                stack.extend(missing)
+                continue
+
+            self.bags_inside[name] = sum(
+                amount * (1 + self.bags_inside[child.name])
+                for child, amount in children
+            )
+            stack.pop()
+
+        return self.bags_inside[bag_name]
+
+    def _ancestors(self, bag_name: str) -> int:
+        stack = [bag_name]
+        while stack:
+            name = stack[-1]
+            if name in self.ancestors:
+                stack.pop()
+                continue
+
+            parents = self.graph[name].parents
+            missing = [
+                parent.name for parent in parents if parent.name not in self.ancestors
+            ]
+            if missing:
+                stack.extend(missing)
+                continue
+
+            ancestors = 0
+            for parent in parents:
+                bit = 1 << self.bit_positions[parent.name]
+                ancestors |= bit | self.ancestors[parent.name]
+            self.ancestors[name] = ancestors
+            stack.pop()
+
+        return self.ancestors[bag_name]
+
+    def _reachable(self, bag_name: str, upwards: bool) -> set[str]:
+        reached = {bag_name}
+        stack = [self.graph[bag_name]]
+        while stack:
+            bag = stack.pop()
+            if upwards:
+                neighbours = bag.parents
+            else:
+                neighbours = [child for child, _ in bag.children]
+            for neighbour in neighbours:
+                if neighbour.name not in reached:
+                    reached.add(neighbour.name)
+                    stack.append(neighbour)
+        return reached
+
+    def _invalidate_descendants(self, bag_name: str) -> None:
+        # ancestor sets below the bag go through the bag's rule
+        for name in self._reachable(bag_name, upwards=False):
+            self.ancestors.pop(name, None)
+
+    def _check_acyclic(
+        self, rule: str, bag_name: str, contents: list[tuple[str, int]]
+    ) -> None:
+        for sub_bag_name, _ in contents:
+            contains_itself = sub_bag_name == bag_name or (
+                bag_name in self.graph
+                and sub_bag_name in self.bit_positions
+                and self._ancestors(bag_name) >> self.bit_positions[sub_bag_name] & 1
+            )
+            if contains_itself:
+                raise ValueError(f"Rule would create a cycle: {rule!r}")
 
-    return len(traverse(graph[bag_name])) - 1
+    def _apply_rule(
+        self, rule: str, bag_name: str, contents: list[tuple[str, int]]
+    ) -> None:
+        add_rule(self.graph, rule)
+        for name in [bag_name, *(name for name, _ in contents)]:
+            self.bit_positions.setdefault(name, len(self.bit_positions))
+
+        # counts above the bag include its contents
+        for name in self._reachable(bag_name, upwards=True):
+            self.bags_inside.pop(name, None)
+        self._invalidate_descendants(bag_name)
+
+    def add_rule(self, rule: str) -> None:
+        bag_name, contents = parse_rule(rule)
+        if bag_name in self.graph and self.graph[bag_name].children:
+            raise ValueError(f"Bag already has a rule, use replace_rule: {rule!r}")
+        self._check_acyclic(rule, bag_name, contents)
+        self._apply_rule(rule, bag_name, contents)
+
+    def remove_rule(self, bag_name: str) -> None:
+        self._invalidate_descendants(bag_name)
+        remove_rule(self.graph, bag_name)
+        for name in self._reachable(bag_name, upwards=True):
+            self.bags_inside.pop(name, None)
+
+    def replace_rule(self, rule: str) -> None:
+        bag_name, contents = parse_rule(rule)
+        # the bag's own ancestors don't depend on its old contents
+        self._check_acyclic(rule, bag_name, contents)
+        if bag_name in self.graph:
+            self.remove_rule(bag_name)
+        self._apply_rule(rule, bag_name, contents)
+
+    def count_bags_that_can_contain_bag(self, bag_name: str) -> int:
+        return self._ancestors(bag_name).bit_count()
+
+    def count_bags_needed(self, bag_name: str) -> int:
+        return self._bags_inside(bag_name)
+
+
+def count_bags_that_can_contain_bag(graph: dict[str, Bag], bag_name: str) -> int:
+    return BagIndex(graph).count_bags_that_can_contain_bag(bag_name)
 
 
 def count_bags_needed(graph: dict[str, Bag], bag_name: str) -> int:
-    def traverse(bag: Bag) -> int:
-        count = 1
-        for child, num in bag.children:
-            count += num * traverse(child)
+    return BagIndex(graph).count_bags_needed(bag_name)
+
+
+def _csr(
+    nodes: int, sources: array, targets: array, amounts: array
+) -> tuple[array, array, array]:
+    offsets = array("i", [0] * (nodes + 1))
+    for source in sources:
+        offsets[source + 1] += 1
+    for node in range(nodes):
+        offsets[node + 1] += offsets[node]
+
+    position = array("i", offsets[:-1])
+    sorted_targets = array("i", [0] * len(targets))
+    sorted_amounts = array("i", [0] * len(amounts))
+    for source, target, amount in zip(sources, targets, amounts):
+        sorted_targets[position[source]] = target
+        sorted_amounts[position[source]] = amount
+        position[source] += 1
+
+    return offsets, sorted_targets, sorted_amounts
+
+
+class CompactBagGraph:
+    # magic, array item size, nodes, edges; arrays follow as little-endian
+    _header = struct.Struct("<4sBII")
+    _magic = b"BAG2"
+
+    def __init__(
+        self,
+        names: list[str],
+        child_offsets: array,
+        child_targets: array,
+        child_amounts: array,
+        parent_offsets: array,
+        parent_targets: array,
+    ) -> None:
+        self.names = names
+        self.ids = {name: idx for idx, name in enumerate(names)}
+        self.child_offsets = child_offsets
+        self.child_targets = child_targets
+        self.child_amounts = child_amounts
+        self.parent_offsets = parent_offsets
+        self.parent_targets = parent_targets
+        self._bags_inside = [-1] * len(names)  # negative until computed
+
+    @classmethod
+    def from_rules(cls: Type[T], rules: Iterable[str]) -> T:
+        ids: dict[str, int] = {}
+        parents = array("i")
+        children = array("i")
+        amounts = array("i")
+        for rule in rules:
+            bag_name, contents = parse_rule(rule)
+            bag_id = ids.setdefault(bag_name, len(ids))
+            for sub_bag_name, amount in contents:
+                parents.append(bag_id)
+                children.append(ids.setdefault(sub_bag_name, len(ids)))
+                amounts.append(amount)
+
+        child_offsets, child_targets, child_amounts = _csr(
+            len(ids), parents, children, amounts
+        )
+        parent_offsets, parent_targets, _ = _csr(len(ids), children, parents, amounts)
+        return cls(
+            list(ids),
+            child_offsets,
+            child_targets,
+            child_amounts,
+            parent_offsets,
+            parent_targets,
+        )
+
+    def save(self, file_name: str) -> None:
+        names = "\n".join(self.names).encode("utf-8")
+        with open(file_name, "wb") as outfile:
+            outfile.write(
+                self._header.pack(
+                    self._magic,
+                    self.child_targets.itemsize,
+                    len(self.names),
+                    len(self.child_targets),
+                )
+            )
+            outfile.write(struct.pack("<I", len(names)))
+            outfile.write(names)
+            for values in (
+                self.child_offsets,
+                self.child_targets,
+                self.child_amounts,
+                self.parent_offsets,
+                self.parent_targets,
+            ):
+                if sys.byteorder == "big":
+                    values = array(values.typecode, values)
+                    values.byteswap()
+                values.tofile(outfile)
+
+    @classmethod
+    def load(cls: Type[T], file_name: str) -> T:
+        with open(file_name, "rb") as infile:
+            magic, item_size, nodes, edges = cls._header.unpack(
+                infile.read(cls._header.size)
+            )
+            if magic != cls._magic:
+                raise ValueError(f"Not a bag graph file: {file_name!r}")
+            if item_size != array("i").itemsize:
+                raise ValueError(f"Unsupported item size {item_size}: {file_name!r}")
+
+            (names_size,) = struct.unpack("<I", infile.read(4))
+            names = infile.read(names_size).decode("utf-8").split("\n")
+            arrays = []
+            for size in (nodes + 1, edges, edges, nodes + 1, edges):
+                values = array("i")
+                values.fromfile(infile, size)
+                if sys.byteorder == "big":
+                    values.byteswap()
+                arrays.append(values)
+
+        return cls(names if nodes else [], *arrays)
+
+    def count_bags_that_can_contain_bag(self, bag_name: str) -> int:
+        bag_id = self.ids[bag_name]
+        seen = bytearray(len(self.names))
+        seen[bag_id] = 1
+        stack = [bag_id]
+        count = 0
+        while stack:
+            current = stack.pop()
+            start, end = self.parent_offsets[current], self.parent_offsets[current + 1]
+            for parent in self.parent_targets[start:end]:
+                if not seen[parent]:
+                    seen[parent] = 1
+                    count += 1
+                    stack.append(parent)
         return count
 
-    return traverse(graph[bag_name]) - 1
+    def count_bags_needed(self, bag_name: str) -> int:
+        bags_inside = self._bags_inside
+        stack = [self.ids[bag_name]]
+        while stack:
+            current = stack[-1]
+            if bags_inside[current] >= 0:
+                stack.pop()
+                continue
+
+            start, end = self.child_offsets[current], self.child_offsets[current + 1]
+            children = self.child_targets[start:end]
+            missing = [child for child in children if bags_inside[child] < 0]
+            if missing:
+                # -2 marks bags whose contents are still being counted below
+                if any(bags_inside[child] == -2 for child in missing):
+                    for bag in stack:
+                        bags_inside[bag] = max(bags_inside[bag], -1)
+                    raise ValueError("Bag rules contain a cycle")
+                bags_inside[current] = -2
+                stack.extend(missing)
+                continue
+
+            bags_inside[current] = sum(
+                amount * (1 + bags_inside[child])
+                for child, amount in zip(children, self.child_amounts[start:end])
+            )
+            stack.pop()
+
+        return bags_inside[self.ids[bag_name]]
 
 
 def main() -> None:
     with open(INPUT, "rt", encoding="utf-8") as infile:
         graph = build_graph(infile.readlines())
 
+    index = BagIndex(graph)
     bag_name = "shiny gold"
-    count_can_contain = count_bags_that_can_contain_bag(graph, bag_name)
-    count_needed = count_bags_needed(graph, bag_name)
+    count_can_contain = index.count_bags_that_can_contain_bag(bag_name)
+    count_needed = index.count_bags_needed(bag_name)
     print(f"Numbers of bags: {count_can_contain} / {count_needed}")  # 208 / 1664
 
 
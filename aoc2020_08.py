@@ -2,9 +2,15 @@
 """--- Day 8: Handheld Halting ---
 https://adventofcode.com/2020/day/8"""
 
-from dataclasses import dataclass
+import json
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
 
 INPUT = "aoc2020_08_input.txt"
+OPERATIONS = ("nop", "acc", "jmp")
+NOP, ACC, JMP = range(len(OPERATIONS))
 
 
 @dataclass
@@ -13,16 +19,56 @@ class Instruction:
     value: int
 
 
+@dataclass
+class ExecutionTrace:
+    hits: list[int]
+    jumps: Counter[tuple[int, int]] = field(default_factory=Counter)
+    cycle: list[int] = field(default_factory=list)
+    wall_time: float = 0.0
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "hits": self.hits,
+                "jumps": [
+                    {"source": source, "target": target, "count": count}
+                    for (source, target), count in self.jumps.items()
+                ],
+                "cycle": self.cycle,
+                "wall_time": self.wall_time,
+            }
+        )
+
+    def to_folded(self, program: "Program") -> str:
+        # "program;block;instruction count" lines for flamegraph tools
+        lines = []
+        for start, end in program.basic_blocks():
+            for idx in range(start, end):
+                if self.hits[idx]:
+                    operation = OPERATIONS[program.opcodes[idx]]
+                    lines.append(
+                        f"program;block {start}-{end - 1};{idx} {operation} "
+                        f"{self.hits[idx]}"
+                    )
+        return "\n".join(lines)
+
+
 class Program:
     def __init__(self) -> None:
         self.instructions: list[Instruction] = []
+        self.opcodes = array("b")
+        self.operands = array("q")
         self.counter: list[int] = []
+        self.visited = bytearray()
         self.pointer = 0
         self.accumulator = 0
         self.has_error = False
+        self.tracing = False
+        self.trace: ExecutionTrace | None = None  # of the last traced run
 
     def _reset(self) -> None:
         self.counter = [0] * len(self.instructions)
+        self.visited = bytearray(len(self.instructions))
         self.pointer = 0
         self.accumulator = 0
         self.has_error = False
@@ -31,10 +77,97 @@ class Program:
         with open(input_file, "rt", encoding="utf-8") as infile:
             for line in infile:
                 operation, string_value, *_ = line.strip().split()
+                if operation not in OPERATIONS:
+                    raise ValueError(f"Incorrect operation: {operation!r}")
                 self.instructions.append(Instruction(operation, int(string_value)))
+                self.opcodes.append(OPERATIONS.index(operation))
+                self.operands.append(int(string_value))
+        self._reset()
+
+    def _set_operation(self, idx: int, operation: str) -> None:
+        self.instructions[idx].operation = operation
+        self.opcodes[idx] = OPERATIONS.index(operation)
+
+    def basic_blocks(self) -> list[tuple[int, int]]:
+        size = len(self.opcodes)
+        leaders = {0, size}
+        for idx, opcode in enumerate(self.opcodes):
+            if opcode == JMP:
+                leaders.add(idx + 1)
+                if 0 <= idx + self.operands[idx] < size:
+                    leaders.add(idx + self.operands[idx])
+        boundaries = sorted(leaders)
+        return list(zip(boundaries, boundaries[1:]))
+
+    def execute(self, reference: bool = False) -> None:
+        if reference:
+            self._execute_reference()
+            return
+        if self.tracing:
+            self._execute_traced()
+            return
+
         self._reset()
+        opcodes = self.opcodes
+        operands = self.operands
+        visited = self.visited
+        size = len(opcodes)
+        pointer = 0
+        accumulator = 0
+
+        while pointer < size:
+            if visited[pointer]:
+                self.has_error = True
+                break
+
+            visited[pointer] = 1
+            opcode = opcodes[pointer]
+            if opcode == NOP:
+                pointer += 1
+            elif opcode == ACC:
+                accumulator += operands[pointer]
+                pointer += 1
+            else:
+                pointer += operands[pointer]
+
+        self.pointer = pointer
+        self.accumulator = accumulator
 
-    def execute(self) -> None:
+    def _execute_traced(self) -> None:
+        start_time = time.perf_counter()
+        self._reset()
+        trace = ExecutionTrace(hits=[0] * len(self.opcodes))
+        first_step: dict[int, int] = {}
+        path: list[int] = []
+        pointer = 0
+        accumulator = 0
+
+        while pointer < len(self.opcodes):
+            if pointer in first_step:
+                self.has_error = True
+                trace.cycle = path[first_step[pointer] :]
+                break
+
+            first_step[pointer] = len(path)
+            path.append(pointer)
+            self.visited[pointer] = 1
+            trace.hits[pointer] += 1
+            opcode = self.opcodes[pointer]
+            if opcode == NOP:
+                pointer += 1
+            elif opcode == ACC:
+                accumulator += self.operands[pointer]
+                pointer += 1
+            else:
+                trace.jumps[pointer, pointer + self.operands[pointer]] += 1
+                pointer += self.operands[pointer]
+
+        self.pointer = pointer
+        self.accumulator = accumulator
+        trace.wall_time = time.perf_counter() - start_time
+        self.trace = trace
+
+    def _execute_reference(self) -> None:
         self._reset()
         while self.pointer < len(self.instructions):
             if self.counter[self.pointer] > 0:
@@ -53,20 +186,91 @@ class Program:
             else:
                 raise ValueError(f"Incorrect operation: {instruction.operation!r}")
 
-    def repair(self) -> None:
+    def _successor(self, idx: int, opcode: int) -> int:
+        return idx + self.operands[idx] if opcode == JMP else idx + 1
+
+    def _terminating_instructions(self) -> bytearray:
+        # instructions from which the unmodified program runs past its end
+        size = len(self.opcodes)
+        successors = array(
+            "q",
+            (self._successor(idx, opcode) for idx, opcode in enumerate(self.opcodes)),
+        )
+
+        offsets = array("q", [0] * (size + 2))
+        for successor in successors:
+            if 0 <= successor < size:
+                offsets[successor + 2] += 1
+        for idx in range(size):
+            offsets[idx + 2] += offsets[idx + 1]
+        predecessors = array("q", [0] * offsets[-1])
+        for idx, successor in enumerate(successors):
+            if 0 <= successor < size:
+                predecessors[offsets[successor + 1]] = idx
+                offsets[successor + 1] += 1
+
+        terminating = bytearray(size)
+        stack = [idx for idx, successor in enumerate(successors) if successor >= size]
+        for idx in stack:
+            terminating[idx] = 1
+        while stack:
+            idx = stack.pop()
+            for predecessor in predecessors[offsets[idx] : offsets[idx + 1]]:
+                if not terminating[predecessor]:
+                    terminating[predecessor] = 1
+                    stack.append(predecessor)
+
+        return terminating
+
+    def repairable_positions(self) -> list[int]:
+        self.execute()
+        if not self.has_error:
+            return []
+
+        size = len(self.opcodes)
+        terminating = self._terminating_instructions()
+        positions = []
+        for idx in range(size):
+            opcode = self.opcodes[idx]
+            if not self.visited[idx] or opcode == ACC:
+                continue
+            # the run up to a first visit is unchanged by flipping it, and the
+            # flipped successor's path can't come back here without looping
+            successor = self._successor(idx, NOP if opcode == JMP else JMP)
+            if successor >= size or (successor >= 0 and terminating[successor]):
+                positions.append(idx)
+
+        return positions
+
+    def repair(self, reference: bool = False) -> None:
+        if reference:
+            self._repair_reference()
+            return
+
+        positions = self.repairable_positions()
+        if not self.has_error:
+            return
+        if not positions:
+            raise RuntimeError("Program unrepairable")
+
+        idx = positions[0]
+        self._set_operation(idx, "jmp" if self.opcodes[idx] == NOP else "nop")
+        self.execute()
+
+    def _repair_reference(self) -> None:
         self.execute()
         if not self.has_error:
             return
 
-        for instruction in self.instructions:
+        for idx, instruction in enumerate(self.instructions):
             if instruction.operation == "acc":
                 continue
 
             original_operation = instruction.operation
             if original_operation == "nop":
-                instruction.operation = "jmp"
+                self._set_operation(idx, "jmp")
             elif original_operation == "jmp":
-                instruction.operation = "nop"
+                self._set_operation(idx, "nop")
             else:
                 raise ValueError(f"Incorrect operation: {original_operation!r}")
 
@@ -74,7 +278,7 @@ class Program:
             if not self.has_error:
                 return
 
-            instruction.operation = original_operation
+            self._set_operation(idx, original_operation)
 
         if self.has_error:
             raise RuntimeError("Program unrepairable")
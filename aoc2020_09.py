@@ -2,42 +2,99 @@
 """--- Day 9: Encoding Error ---
 https://adventofcode.com/2020/day/9"""
 
-from aoc2020_01 import find_n_entries
+import itertools
+from array import array
+from collections import Counter, deque
+from typing import Iterable, Sequence
+
+from aoc2020_01 import find_n_entries, load_integers
 
 INPUT = "aoc2020_09_input.txt"
 PREAMBLE = 25
 
 
-def find_error(data: list[int], preamble: int) -> int:
+def _is_sum_of_two(window_counts: Counter[int], number: int) -> bool:
+    for value in window_counts:
+        remaining = number - value
+        if remaining in window_counts and (
+            remaining != value or window_counts[value] > 1
+        ):
+            return True
+    return False
+
+
+def find_error(data: Iterable[int], preamble: int = PREAMBLE) -> int:
+    numbers = iter(data)
+    window = deque(itertools.islice(numbers, preamble))
+    window_counts = Counter(window)
+
+    for number in numbers:
+        if not _is_sum_of_two(window_counts, number):
+            return number
+
+        window.append(number)
+        window_counts[number] += 1
+        oldest = window.popleft()
+        window_counts[oldest] -= 1
+        if not window_counts[oldest]:
+            del window_counts[oldest]
+
+    return 0
+
+
+def find_error_sorted_windows(data: Sequence[int], preamble: int = PREAMBLE) -> int:
     for head, number in enumerate(data[preamble:], start=preamble):
         if not find_n_entries(sorted(data[head - preamble : head]), 2, number):
             return number
     return 0
 
 
-def find_contiguous_set(numbers: list[int], value: int) -> list[int]:
-    start, end = 0, 1
-    total = numbers[start]
+class PrefixSumIndex:
+    def __init__(self, numbers: Sequence[int]) -> None:
+        self.numbers = numbers
+        self.prefix_sums = array("q", itertools.accumulate(numbers, initial=0))
+
+    def find_ranges(
+        self, values: Iterable[int], min_length: int = 2
+    ) -> dict[int, tuple[int, int] | None]:
+        ranges: dict[int, tuple[int, int] | None] = dict.fromkeys(values)
+        pending = set(ranges)
+        first_position: dict[int, int] = {}
+
+        for end in range(min_length, len(self.prefix_sums)):
+            if not pending:
+                break
+
+            # only prefixes at least min_length numbers behind end are eligible
+            start = end - min_length
+            first_position.setdefault(self.prefix_sums[start], start)
+            prefix_sum = self.prefix_sums[end]
+            for value in list(pending):
+                range_start = first_position.get(prefix_sum - value)
+                if range_start is not None:
+                    ranges[value] = (range_start, end)
+                    pending.remove(value)
+
+        return ranges
+
+    def find_range(self, value: int, min_length: int = 2) -> tuple[int, int] | None:
+        return self.find_ranges([value], min_length)[value]
+
+    def contiguous_set(self, value: int) -> Sequence[int]:
+        range_ = self.find_range(value)
+        if range_ is None:
+            raise ValueError(f"No contigous set has sum of {value}")
+
+        start, end = range_
+        return self.numbers[start:end]
+
 
-    while start < end and end < len(numbers):
-        if total < value:
-            total += numbers[end]
-            end += 1
-        elif total > value:
-            total -= numbers[start]
-            start += 1
-        elif end - start == 1:  # correct sum but only one number
-            start += 1
-            end += 1
-            total = numbers[start]
-        else:
-            return numbers[start:end]
-    raise ValueError(f"No contigous set has sum of {value}")
+def find_contiguous_set(numbers: Sequence[int], value: int) -> Sequence[int]:
+    return PrefixSumIndex(numbers).contiguous_set(value)
 
 
 def main() -> None:
-    with open(INPUT, "rt", encoding="utf-8") as infile:
-        numbers = [int(number) for number in infile]
+    numbers = load_integers(INPUT)
 
     error = find_error(numbers, PREAMBLE)
     contiguous_set = find_contiguous_set(numbers, error)
@@ -4,21 +4,66 @@ https://adventofcode.com/2020/day/10"""
 
 import itertools
 import math
-from collections import defaultdict
-from typing import Iterator
+from array import array
+from collections import defaultdict, deque
+from typing import Iterable, Iterator
+
+from aoc2020_01 import iter_integers
 
 INPUT = "aoc2020_10_input.txt"
+MAX_GAP = 3
 
 
-def count_differences(adapters: list[int]) -> dict[int, int]:
+def adapter_presence(adapters: Iterable[int]) -> array:
+    # counting sort: number of adapters per joltage, the outlet included
+    presence = array("q", [1])
+    for adapter in adapters:
+        if adapter < 0:
+            raise ValueError(f"Incorrect joltage: {adapter}")
+        if adapter >= len(presence):
+            presence.extend(
+                array("q", [0]) * (max(adapter + 1, 2 * len(presence)) - len(presence))
+            )
+        presence[adapter] += 1
+
+    return presence
+
+
+def iter_joltages(presence: array) -> Iterator[int]:
+    for joltage in itertools.compress(range(len(presence)), presence):
+        yield from itertools.repeat(joltage, presence[joltage])
+
+
+def summarize_adapters(
+    adapters: Iterable[int], max_gap: int = MAX_GAP
+) -> tuple[dict[int, int], int]:
+    # adapters are sorted and start with the outlet
     differences: dict[int, int] = defaultdict(int)
-    last_adapter = adapters[0]
-    for adapter in adapters[1:]:
-        difference = adapter - last_adapter
-        differences[difference] += 1
+    iterator = iter(adapters)
+    last_adapter = next(iterator)
+
+    # ways to reach an adapter is the sum of ways to reach the adapters at
+    # most max_gap below it; only that window of (adapter, ways) is kept
+    window = deque([(last_adapter, 1)])
+    window_sum = 1
+    ways = 1
+    for adapter in iterator:
+        differences[adapter - last_adapter] += 1
         last_adapter = adapter
+
+        while window and adapter - window[0][0] > max_gap:
+            window_sum -= window.popleft()[1]
+        ways = window_sum
+        window.append((adapter, ways))
+        window_sum += ways
+
     differences[3] += 1  # device's built-in adapter
 
+    return differences, ways
+
+
+def count_differences(adapters: list[int]) -> dict[int, int]:
+    differences, _ = summarize_adapters(adapters)
     return differences
 
 
@@ -66,7 +111,12 @@ def can_drop(adapters: list[int], to_drop: list[int]) -> bool:
     return True
 
 
-def count_distinct_adapter_chains(adapters: list[int]) -> int:
+def count_distinct_adapter_chains(adapters: list[int], max_gap: int = MAX_GAP) -> int:
+    _, ways = summarize_adapters(adapters, max_gap)
+    return ways
+
+
+def count_distinct_adapter_chains_by_groups(adapters: list[int]) -> int:
     ways_to_plug_withing_group = []
     for group in droppable_adapters(adapters):
         droppable_configurations = 0
@@ -79,15 +129,11 @@ def count_distinct_adapter_chains(adapters: list[int]) -> int:
 
 
 def main() -> None:
-    with open(INPUT, "rt", encoding="utf-8") as infile:
-        adapters = [int(line.strip()) for line in infile]
-
-    adapters = [0] + sorted(adapters)
-    differences = count_differences(adapters)
+    presence = adapter_presence(iter_integers(INPUT))
+    differences, distinct_chains = summarize_adapters(iter_joltages(presence))
     multiplied_1_3 = differences[1] * differences[3]
     print(f"Product of 1-jolt and 3-jolt differences: {multiplied_1_3}")  # 2210
 
-    distinct_chains = count_distinct_adapter_chains(adapters)
     print(
         f"Number of distinct ways to arrange the adapters: {distinct_chains}"
     )  # 7086739046912
@@ -2,13 +2,20 @@
 """--- Day 11: Seating System ---
 https://adventofcode.com/2020/day/11"""
 
+from array import array
 from collections import Counter
-from typing import Iterator, Literal
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Iterable, Iterator, Literal, Sequence
 
 INPUT = "aoc2020_11_input.txt"
 EMPTY = "L"
 OCCUPIED = "#"
 FLOOR = "."
+DIRECTIONS = [(0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)]
+# largest share of seats changing in a round that is cheaper to follow seat by
+# seat than to recompute the whole grid
+FRONTIER_SHARE = {"adjacent": 0.01, "visible": 0.25}
 
 
 class WaitingArea:
@@ -82,16 +89,7 @@ class WaitingArea:
 
     def _visible_counter(self, row: int, column: int) -> dict[str, int]:
         counter: dict[str, int] = Counter()
-        for direction in [
-            (0, -1),
-            (1, -1),
-            (1, 0),
-            (1, 1),
-            (0, 1),
-            (-1, 1),
-            (-1, 0),
-            (-1, -1),
-        ]:
+        for direction in DIRECTIONS:
             for r, c in self._visible_coordinates(row, column, direction):
                 if self.seat_layout[r][c] in [EMPTY, OCCUPIED]:
                     counter[self.seat_layout[r][c]] += 1
@@ -102,32 +100,470 @@ class WaitingArea:
         return "\n" + "\n".join("".join(row) for row in self.seat_layout) + "\n"
 
 
-def occupied_seats_method_1(seat_layout: list[list[str]]) -> int:
-    waiting_area = WaitingArea(seat_layout)
+class PackedWaitingArea:
+    # One byte per cell in a grid padded with a floor border, so every
+    # neighbour offset stays inside the buffer. Rounds treat the occupancy
+    # bytes as one big int and work on all cells at once.
+
+    _seat_table = bytes(chr(byte) in (EMPTY, OCCUPIED) for byte in range(256))
+    _occupied_table = bytes(chr(byte) == OCCUPIED for byte in range(256))
+
+    def __init__(self, seat_layout: list[list[str]]) -> None:
+        self.width = len(seat_layout[0])
+        self.height = len(seat_layout)
+        self.stride = self.width + 2
+        self.size = (self.height + 2) * self.stride
+        self.seats = bytearray(self.size)
+        self.occupancy = bytearray(self.size)
+        self._next_occupancy = bytearray(self.size)
+
+        for row, states in enumerate(seat_layout):
+            start = self.index(row, 0)
+            line = "".join(states).encode("utf-8")
+            if len(line) != self.width:
+                raise ValueError(f"Row {row} is not {self.width} cells wide")
+            self.seats[start : start + self.width] = line.translate(self._seat_table)
+            self.occupancy[start : start + self.width] = line.translate(
+                self._occupied_table
+            )
+
+        self._ones = int.from_bytes(b"\x01" * self.size, "little")
+        self._seat_bits = int.from_bytes(self.seats, "little")
+        self._offsets = [dr * self.stride + dc for dr, dc in DIRECTIONS]
+        self._seat_positions: array | None = None
+        self._cell_seats: array | None = None
+        self._adjacent_neighbours: array | None = None
+        self._visible_neighbours: array | None = None
+        # seat-ordered states plus an always empty lane, kept by visible rounds
+        self._seat_states: bytes | bytearray | None = None
+        self._occupancy_stale = False
+        self.changes: list[int] = []  # cells changed in each round
+
+    def index(self, row: int, column: int) -> int:
+        return (row + 1) * self.stride + column + 1
+
+    @staticmethod
+    def _adjacent_counts(occupied: int, offsets: list[int]) -> int:
+        # byte i of the result is the number of occupied neighbours of cell i
+        counts = 0
+        for offset in offsets:
+            if offset > 0:
+                counts += occupied >> 8 * offset
+            else:
+                counts += occupied << -8 * offset
+        return counts
+
+    @staticmethod
+    def _at_least(counts: int, threshold: int, ones: int) -> int:
+        # counts are at most 8, so adding 128 - threshold to every byte sets
+        # its high bit exactly when count >= threshold, without any carries
+        threshold = min(max(threshold, 0), len(DIRECTIONS) + 1)
+        biased = counts + ones * (128 - threshold)
+        return biased >> 7 & ones
+
+    @classmethod
+    def _next_state(cls, occupied: int, counts: int, tolerance: int, ones: int) -> int:
+        crowded = cls._at_least(counts, tolerance, ones)
+        alone = ones ^ cls._at_least(counts, 1, ones)
+        return (occupied & (ones ^ crowded)) | ((ones ^ occupied) & alone)
+
+    @property
+    def seat_positions(self) -> array:
+        if self._seat_positions is None:
+            self._seat_positions = array(
+                "i", (idx for idx, seat in enumerate(self.seats) if seat)
+            )
+        return self._seat_positions
+
+    @property
+    def cell_seats(self) -> array:
+        # seat number of every cell, -1 for floor
+        if self._cell_seats is None:
+            cell_seats = array("i", [-1]) * self.size
+            for seat, idx in enumerate(self.seat_positions):
+                cell_seats[idx] = seat
+            self._cell_seats = cell_seats
+        return self._cell_seats
+
+    @property
+    def adjacent_neighbours(self) -> array:
+        # seats x 8 numbers of the seat next to it in each direction, -1 for
+        # floor and the border
+        if self._adjacent_neighbours is None:
+            cell_seats = self.cell_seats
+            self._adjacent_neighbours = array(
+                "i",
+                (
+                    cell_seats[idx + offset]
+                    for idx in self.seat_positions
+                    for offset in self._offsets
+                ),
+            )
+        return self._adjacent_neighbours
+
+    @property
+    def visible_neighbours(self) -> array:
+        # seats x 8 numbers of the first seat seen in each direction, -1 when
+        # there is none
+        if self._visible_neighbours is not None:
+            return self._visible_neighbours
+
+        seat_positions = self.seat_positions
+        cell_seats = self.cell_seats
+        interior = [
+            self.index(row, column)
+            for row in range(self.height)
+            for column in range(self.width)
+        ]
+        directions = len(DIRECTIONS)
+        neighbours = array("i", [-1]) * (len(seat_positions) * directions)
+        for direction, offset in enumerate(self._offsets):
+            nearest = array("i", [-1]) * self.size
+            # the cell in the looking direction has to be resolved first
+            for idx in reversed(interior) if offset > 0 else interior:
+                neighbour = idx + offset
+                if self.seats[neighbour]:
+                    nearest[idx] = neighbour
+                else:
+                    nearest[idx] = nearest[neighbour]
+            # nearest -1 is the last cell, which is border floor
+            for seat, idx in enumerate(seat_positions):
+                neighbours[seat * directions + direction] = cell_seats[nearest[idx]]
+
+        self._visible_neighbours = neighbours
+        return neighbours
+
+    @staticmethod
+    def _gathered_counts(neighbours: Sequence[int], seat_states: Sequence[int]) -> int:
+        # byte i of the result is the number of occupied neighbours of seat i
+        get_state = seat_states.__getitem__
+        counts = 0
+        for direction in range(len(DIRECTIONS)):
+            gathered = map(get_state, neighbours[direction :: len(DIRECTIONS)])
+            counts += int.from_bytes(bytes(gathered), "little")
+        return counts
+
+    def _sync_occupancy(self) -> None:
+        if self._occupancy_stale and self._seat_states is not None:
+            # floor cells read the empty lane at seat index -1
+            get_state = self._seat_states.__getitem__
+            self.occupancy[:] = bytes(map(get_state, self.cell_seats))
+            self._occupancy_stale = False
+
+    def _adjacent_round(self, tolerance: int) -> bool:
+        self._sync_occupancy()
+        self._seat_states = None
+        occupied = int.from_bytes(self.occupancy, "little")
+        counts = self._adjacent_counts(occupied, self._offsets)
+        next_occupied = self._seat_bits & self._next_state(
+            occupied, counts, tolerance, self._ones
+        )
+        self.changes.append((next_occupied ^ occupied).bit_count())
+        if next_occupied == occupied:
+            return False
+
+        self._next_occupancy[:] = next_occupied.to_bytes(self.size, "little")
+        self.occupancy, self._next_occupancy = self._next_occupancy, self.occupancy
+        return True
+
+    def _visible_round(self, tolerance: int) -> bool:
+        # same rule on seat-ordered lanes, gathered through the neighbour table
+        neighbours = self.visible_neighbours
+        seats = len(self.seat_positions)
+        if self._seat_states is None:
+            get_cell = self.occupancy.__getitem__
+            self._seat_states = bytes(map(get_cell, self.seat_positions)) + b"\x00"
+
+        occupied = int.from_bytes(self._seat_states, "little")
+        counts = self._gathered_counts(neighbours, self._seat_states)
+        ones = int.from_bytes(b"\x01" * seats, "little")
+        next_occupied = self._next_state(occupied, counts, tolerance, ones)
+        self.changes.append((next_occupied ^ occupied).bit_count())
+        if next_occupied == occupied:
+            return False
+
+        self._seat_states = next_occupied.to_bytes(seats + 1, "little")
+        self._occupancy_stale = True
+        return True
+
+    def make_round(
+        self, method: Literal["adjacent", "visible"], tolerance: int
+    ) -> bool:
+        if method == "adjacent":
+            return self._adjacent_round(tolerance)
+        if method == "visible":
+            return self._visible_round(tolerance)
+        raise ValueError(f"Incorrect method specified: {method!r}")
+
+    @property
+    def occupied_seats(self) -> int:
+        if self._seat_states is not None:
+            return self._seat_states.count(1)
+        return self.occupancy.count(1)
+
+    @property
+    def seat_layout(self) -> list[list[str]]:
+        self._sync_occupancy()
+        layout = []
+        for row in range(self.height):
+            states = []
+            for column in range(self.width):
+                idx = self.index(row, column)
+                if self.occupancy[idx]:
+                    states.append(OCCUPIED)
+                elif self.seats[idx]:
+                    states.append(EMPTY)
+                else:
+                    states.append(FLOOR)
+            layout.append(states)
+        return layout
+
+    def __str__(self) -> str:
+        return "\n" + "\n".join("".join(row) for row in self.seat_layout) + "\n"
+
+
+class FrontierWaitingArea(PackedWaitingArea):
+    # Runs whole-grid rounds while many seats change, then keeps the occupied
+    # neighbour count of every seat and only re-evaluates seats next to one
+    # that changed in the previous round.
+
+    def __init__(self, seat_layout: list[list[str]]) -> None:
+        super().__init__(seat_layout)
+        self._rule: tuple[str, int] | None = None
+        self._neighbours = array("i")
+        self._states = bytearray()
+        self._counts = array("b")
+        self._frontier: Iterable[int] | None = None
+
+    def _start_frontier(self, method: Literal["adjacent", "visible"]) -> None:
+        if method == "adjacent":
+            self._neighbours = self.adjacent_neighbours
+        else:
+            self._neighbours = self.visible_neighbours
+
+        self._sync_occupancy()
+        get_cell = self.occupancy.__getitem__
+        # frontier rounds flip single seats in place
+        self._states = bytearray(map(get_cell, self.seat_positions)) + b"\x00"
+        self._seat_states = self._states
+        seats = len(self.seat_positions)
+        counts = self._gathered_counts(self._neighbours, self._states)
+        self._counts = array("b", counts.to_bytes(seats + 1, "little"))
+        self._frontier = range(seats)
+
+    def _frontier_round(self, frontier: Iterable[int], tolerance: int) -> bool:
+        states = self._states
+        counts = self._counts
+        flipped = [
+            seat
+            for seat in frontier
+            if (counts[seat] >= tolerance if states[seat] else not counts[seat])
+        ]
+        self.changes.append(len(flipped))
+
+        neighbours = self._neighbours
+        directions = len(DIRECTIONS)
+        next_frontier = set(flipped)
+        for seat in flipped:
+            state = states[seat] ^ 1
+            states[seat] = state
+            delta = 1 if state else -1
+            for neighbour in neighbours[seat * directions : (seat + 1) * directions]:
+                if neighbour >= 0:
+                    counts[neighbour] += delta
+                    next_frontier.add(neighbour)
+        self._frontier = next_frontier
+
+        if flipped:
+            self._occupancy_stale = True
+        return bool(flipped)
+
+    def make_round(
+        self, method: Literal["adjacent", "visible"], tolerance: int
+    ) -> bool:
+        if self._rule != (method, tolerance):
+            self._rule = (method, tolerance)
+            self._frontier = None
+        if self._frontier is not None:
+            return self._frontier_round(self._frontier, tolerance)
+
+        changed = super().make_round(method, tolerance)
+        if changed and self.changes[-1] <= FRONTIER_SHARE[method] * len(
+            self.seat_positions
+        ):
+            self._start_frontier(method)
+        return changed
+
+
+def occupied_seats_method_1(
+    seat_layout: list[list[str]],
+    area_type: type[WaitingArea] | type[PackedWaitingArea] = WaitingArea,
+) -> int:
+    waiting_area = area_type(seat_layout)
     seats_changed = waiting_area.make_round("adjacent", tolerance=4)
     while seats_changed:
         seats_changed = waiting_area.make_round("adjacent", tolerance=4)
     return waiting_area.occupied_seats
 
 
-def occupied_seats_method_2(seat_layout: list[list[str]]) -> int:
-    waiting_area = WaitingArea(seat_layout)
+def occupied_seats_method_2(
+    seat_layout: list[list[str]],
+    area_type: type[WaitingArea] | type[PackedWaitingArea] = WaitingArea,
+) -> int:
+    waiting_area = area_type(seat_layout)
     seats_changed = waiting_area.make_round("visible", tolerance=5)
     while seats_changed:
         seats_changed = waiting_area.make_round("visible", tolerance=5)
     return waiting_area.occupied_seats
 
 
+# block shared by the band rounds of occupied_seats_parallel, set in each worker
+_band_memory: shared_memory.SharedMemory | None = None
+
+
+def _attach_band_memory(name: str) -> None:
+    global _band_memory
+    _band_memory = shared_memory.SharedMemory(name=name)
+
+
+def _bands(total: int, count: int) -> list[tuple[int, int]]:
+    count = max(1, min(count, total))
+    bounds = [total * band // count for band in range(count + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def _adjacent_band(
+    stride: int, start: int, end: int, source: int, target: int, tolerance: int
+) -> int:
+    # block: seat mask, then two padded grids; start and end are whole rows
+    # and the rows either side of the band are read as halo
+    if _band_memory is None or _band_memory.buf is None:
+        raise RuntimeError("Band memory is not attached")
+    buffer = _band_memory.buf
+    low, high = start - stride, end + stride
+    occupied = int.from_bytes(buffer[source + low : source + high], "little")
+    offsets = [dr * stride + dc for dr, dc in DIRECTIONS]
+    counts = PackedWaitingArea._adjacent_counts(occupied, offsets)
+    ones = int.from_bytes(b"\x01" * (high - low), "little")
+    next_occupied = PackedWaitingArea._next_state(occupied, counts, tolerance, ones)
+
+    seat_bits = int.from_bytes(buffer[start:end], "little")
+    band = next_occupied >> 8 * stride & seat_bits
+    buffer[target + start : target + end] = band.to_bytes(end - start, "little")
+    return (band ^ occupied >> 8 * stride & seat_bits).bit_count()
+
+
+def _visible_band(
+    seats: int, start: int, end: int, source: int, target: int, tolerance: int
+) -> int:
+    # block: seats x 8 neighbour table, then two seat state vectors with an
+    # empty last lane; the whole source vector is readable, so no halo copy
+    if _band_memory is None or _band_memory.buf is None:
+        raise RuntimeError("Band memory is not attached")
+    buffer = _band_memory.buf
+    directions = len(DIRECTIONS)
+    neighbours = buffer[: seats * directions * 4].cast("i")
+    seat_states = buffer[source : source + seats + 1]
+    band_neighbours = neighbours[start * directions : end * directions]
+    counts = PackedWaitingArea._gathered_counts(band_neighbours, seat_states)
+    occupied = int.from_bytes(seat_states[start:end], "little")
+    ones = int.from_bytes(b"\x01" * (end - start), "little")
+    next_occupied = PackedWaitingArea._next_state(occupied, counts, tolerance, ones)
+
+    buffer[target + start : target + end] = next_occupied.to_bytes(
+        end - start, "little"
+    )
+    return (next_occupied ^ occupied).bit_count()
+
+
+def _run_band_rounds(
+    map_bands: Callable[..., Iterable[int]],
+    run_band: Callable[[int, int, int, int, int, int], int],
+    dimension: int,
+    bands: list[tuple[int, int]],
+    buffers: tuple[int, int],
+    tolerance: int,
+) -> int:
+    # every round is a barrier, after which the two state buffers swap roles
+    source, target = buffers
+    while True:
+        arguments = [
+            (dimension, start, end, source, target, tolerance) for start, end in bands
+        ]
+        changed = any(list(map_bands(run_band, *zip(*arguments))))
+        source, target = target, source
+        if not changed:
+            return source
+
+
+def occupied_seats_parallel(
+    seat_layout: list[list[str]],
+    method: Literal["adjacent", "visible"],
+    tolerance: int,
+    workers: int = 1,
+) -> int:
+    # rounds run as row bands over one shared memory block
+    global _band_memory
+    area = PackedWaitingArea(seat_layout)
+    run_band: Callable[[int, int, int, int, int, int], int]
+    if method == "adjacent":
+        run_band = _adjacent_band
+        layout = bytes(area.seats)
+        state_size = area.size
+        states = bytes(area.occupancy)
+        bands = [
+            ((first + 1) * area.stride, (last + 1) * area.stride)
+            for first, last in _bands(area.height, workers)
+        ]
+        dimension = area.stride
+    elif method == "visible":
+        run_band = _visible_band
+        layout = area.visible_neighbours.tobytes()
+        seats = len(area.seat_positions)
+        state_size = seats + 1
+        get_cell = area.occupancy.__getitem__
+        states = bytes(map(get_cell, area.seat_positions)) + b"\x00"
+        bands = _bands(seats, workers)
+        dimension = seats
+    else:
+        raise ValueError(f"Incorrect method specified: {method!r}")
+
+    buffers = (len(layout), len(layout) + state_size)
+    memory = shared_memory.SharedMemory(create=True, size=len(layout) + 2 * state_size)
+    try:
+        buffer = memory.buf
+        assert buffer is not None
+        buffer[: len(layout)] = layout
+        buffer[buffers[0] : buffers[0] + state_size] = states
+        if workers <= 1:
+            _band_memory = memory
+            source = _run_band_rounds(
+                map, run_band, dimension, bands, buffers, tolerance
+            )
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_attach_band_memory,
+                initargs=(memory.name,),
+            ) as executor:
+                source = _run_band_rounds(
+                    executor.map, run_band, dimension, bands, buffers, tolerance
+                )
+        return buffer[source : source + state_size].tobytes().count(1)
+    finally:
+        _band_memory = None
+        memory.close()
+        memory.unlink()
+
+
 def main() -> None:
     with open(INPUT, "rt", encoding="utf-8") as infile:
         seat_layout = [list(line.strip()) for line in infile]
 
-    print(
-        f"Number of occupied seats part 1: {occupied_seats_method_1(seat_layout)}"
-    )  # 2178
-    print(
-        f"Number of occupied seats part 2: {occupied_seats_method_2(seat_layout)}"
-    )  # 1978
+    occupied_seats = occupied_seats_method_1(seat_layout, PackedWaitingArea)
+    print(f"Number of occupied seats part 1: {occupied_seats}")  # 2178
+    occupied_seats = occupied_seats_method_2(seat_layout, FrontierWaitingArea)
+    print(f"Number of occupied seats part 2: {occupied_seats}")  # 1978
 
 
 if __name__ == "__main__":